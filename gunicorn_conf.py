@@ -0,0 +1,33 @@
+"""
+Gunicorn configuration for the MongoDB HTTP Bridge
+==================================================
+Production server setup: gevent workers let every worker keep many
+requests in flight while they wait on MongoDB, instead of one per thread.
+
+Usage:
+    pip install gunicorn gevent
+    gunicorn -c gunicorn_conf.py mongodb_bridge:app
+
+The gevent worker monkey-patches the standard library before the app is
+imported, so PyMongo's sockets cooperate with gevent out of the box.
+"""
+
+import os
+import secrets
+import multiprocessing
+
+bind = os.environ.get("BIND", "0.0.0.0:80")
+workers = int(os.environ.get("WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gevent"
+worker_connections = 1000
+keepalive = 5
+
+# Each worker imports the app on its own, so a temporary key has to be
+# picked here once - otherwise every worker would generate a different one
+if not os.environ.get("API_KEY"):
+    os.environ["API_KEY"] = secrets.token_urlsafe(32)
+    print(f"\n{'='*60}")
+    print("⚠️  No API_KEY environment variable set!")
+    print(f"   Generated temporary API key:\n")
+    print(f"   {os.environ['API_KEY']}")
+    print(f"{'='*60}\n")
@@ -6,17 +6,25 @@ A secure REST API that provides full MongoDB access over HTTP.
 Run this on your server to allow Claude to query your database.
 
 Requirements:
-    pip install flask pymongo
+    pip install flask pymongo orjson cachetools
+    pip install python-bsonjs   # optional, transcodes query results in C
+    pip install "flask-compress>=1.22"  # optional, gzip/brotli compresses responses
+    pip install ormsgpack       # optional, serves Accept: application/msgpack
 
 Usage:
     1. Set environment variables:
        export MONGO_URI="mongodb://localhost:27017"
        export API_KEY="your-secret-key-here"
+       export MONGO_MAX_POOL_SIZE=200   # optional, connections per process
     
     2. Run the server:
        python3 mongodb_bridge.py
     
-    3. For production with HTTPS (recommended):
+    3. For production, run under gunicorn with gevent workers:
+       pip install gunicorn gevent
+       gunicorn -c gunicorn_conf.py mongodb_bridge:app
+    
+    4. For HTTPS (recommended):
        Use nginx as reverse proxy with SSL, or:
        pip install pyopenssl
        python3 mongodb_bridge.py --ssl
@@ -28,23 +36,85 @@ Security:
 """
 
 import os
+import re
 import sys
-import json
 import secrets
 import argparse
+import itertools
+import math
+import threading
 from datetime import datetime
-from functools import wraps
-
-from flask import Flask, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+from importlib.metadata import PackageNotFoundError, version
+
+import orjson
+from cachetools import TTLCache
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+from werkzeug.serving import WSGIRequestHandler
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
-from bson import ObjectId, json_util
+from bson import ObjectId, encode as bson_encode, json_util
+from bson.codec_options import CodecOptions
 from bson.errors import InvalidId
+from bson.json_util import JSONMode, JSONOptions
+from bson.raw_bson import RawBSONDocument
+
+try:
+    import bsonjs
+except ImportError:
+    bsonjs = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+try:
+    import ormsgpack
+except ImportError:
+    ormsgpack = None
 
 app = Flask(__name__)
 
+# Response formats, picked per request from the Accept header
+JSON_MIMETYPE = "application/json"
+BSON_MIMETYPE = "application/bson"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# JSON comes first so it wins for */* and missing Accept headers
+RESPONSE_MIMETYPES = [JSON_MIMETYPE, BSON_MIMETYPE]
+if ormsgpack is not None:
+    RESPONSE_MIMETYPES.append(MSGPACK_MIMETYPE)
+
+# Compress responses above 1 KB when flask-compress is installed
+if Compress is not None:
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    # flask-compress leaves gzip out of streamed responses by default, which
+    # would skip query results for gzip-only clients
+    app.config["COMPRESS_ALGORITHM_STREAMING"] = ["br", "gzip"]
+    app.config["COMPRESS_MIMETYPES"] = RESPONSE_MIMETYPES
+    app.config["COMPRESS_MIN_SIZE"] = 1024
+    # Before 1.21 flask-compress reads a streamed body fully into memory to
+    # compress it, which would undo streaming query results. If the installed
+    # version can't be determined, play safe and leave streams uncompressed.
+    try:
+        if tuple(int(part) for part in version("flask-compress").split(".")[:2]) < (1, 21):
+            app.config["COMPRESS_STREAMS"] = False
+    except (PackageNotFoundError, ValueError):
+        app.config["COMPRESS_STREAMS"] = False
+    Compress(app)
+
 # Configuration
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "200"))
+# Never ask for more idle connections than the pool may hold (0 means unlimited)
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "16"))
+if MONGO_MAX_POOL_SIZE:
+    MONGO_MIN_POOL_SIZE = min(MONGO_MIN_POOL_SIZE, MONGO_MAX_POOL_SIZE)
+# Opt-in wire compression, e.g. "zstd,snappy" (needs the zstandard / python-snappy modules)
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "")
 API_KEY = os.environ.get("API_KEY", None)
 
 # Generate a random API key if not provided
@@ -58,57 +128,297 @@ if not API_KEY:
     print(f"   export API_KEY=\"{API_KEY}\"")
     print(f"{'='*60}\n")
 
-# MongoDB client (lazy connection)
+# Encoded once so each request only pays for a constant-time bytes compare
+_API_KEY_BYTES = API_KEY.encode()
+
+# MongoDB client (lazy connection, shared by all request threads)
 _client = None
+_client_lock = threading.Lock()
 
 def get_client():
     global _client
     if _client is None:
-        _client = MongoClient(MONGO_URI)
+        with _client_lock:
+            if _client is None:
+                options = {
+                    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+                    "minPoolSize": MONGO_MIN_POOL_SIZE,
+                    "maxIdleTimeMS": 60000
+                }
+                if MONGO_COMPRESSORS:
+                    options["compressors"] = MONGO_COMPRESSORS
+                _client = MongoClient(MONGO_URI, **options)
     return _client
 
 
-def parse_json_extended(data):
-    """Parse JSON with MongoDB extended JSON support."""
-    return json_util.loads(json.dumps(data))
+@lru_cache(maxsize=1024)
+def get_database(db_name):
+    """Get a database handle, reused across requests."""
+    return get_client()[db_name]
+
+
+@lru_cache(maxsize=1024)
+def get_collection(db_name, coll_name):
+    """Get a collection handle, reused across requests."""
+    return get_database(db_name)[coll_name]
+
+
+_RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+@lru_cache(maxsize=1024)
+def get_raw_collection(db_name, coll_name):
+    """Get a collection handle whose cursors return undecoded BSON documents."""
+    return get_collection(db_name, coll_name).with_options(codec_options=_RAW_CODEC_OPTIONS)
+
+
+def get_result_collection(db_name, coll_name):
+    """Get the collection handle that suits the response format for query results."""
+    # BSON responses reuse the raw bytes as-is, JSON ones when bsonjs can transcode them
+    mimetype = response_mimetype()
+    if mimetype == BSON_MIMETYPE or (mimetype == JSON_MIMETYPE and bsonjs is not None):
+        return get_raw_collection(db_name, coll_name)
+    return get_collection(db_name, coll_name)
+
+
+# Extended JSON settings shared by every json_util call in and out
+_JSON_OPTIONS = JSONOptions(json_mode=JSONMode.RELAXED)
+
+
+# Keys json_util turns into BSON types. A \u escape could spell one of them,
+# so bodies with escapes take the json_util path as well.
+_EXTENDED_JSON_MARKERS = re.compile(
+    rb'"\$(?:oid|date|numberInt|numberLong|numberDouble|numberDecimal|binary|uuid'
+    rb'|regularExpression|regex|timestamp|code|symbol|dbPointer|ref|minKey|maxKey'
+    rb'|undefined)"|\\u'
+)
+
+
+def parse_request_json():
+    """Parse the request body as MongoDB extended JSON in a single pass."""
+    body = request.get_data(cache=False)
+    if not body:
+        return None
+    # Plain JSON decodes identically either way, and orjson does it in C
+    if _EXTENDED_JSON_MARKERS.search(body) is None:
+        return orjson.loads(body)
+    return json_util.loads(body, json_options=_JSON_OPTIONS)
+
+
+def _bson_default(obj):
+    """Encode BSON types orjson doesn't know as relaxed extended JSON."""
+    if isinstance(obj, ObjectId):
+        return {"$oid": str(obj)}
+    # Builtin subclasses are passed through to here so str-based types like
+    # Code keep their extended JSON form; containers such as SON just unwrap
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, list):
+        return list(obj)
+    encoded = json_util.default(obj, json_options=_JSON_OPTIONS)
+    if encoded is obj:
+        # A str/int subclass json_util has no special form for
+        return str(obj) if isinstance(obj, str) else int(obj)
+    return encoded
+
+
+_DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+
+
+def _has_non_finite(data):
+    """Check whether data holds a NaN or infinite float anywhere."""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(value) for value in data)
+    return False
+
+
+def _dumps(data):
+    """Encode data as relaxed extended JSON bytes."""
+    body = orjson.dumps(data, default=_bson_default, option=_DUMPS_OPTIONS)
+    # orjson writes NaN/Infinity as null, json_util keeps them as {"$numberDouble": ...}
+    if b"null" in body and _has_non_finite(data):
+        return json_util.dumps(data, json_options=_JSON_OPTIONS).encode()
+    return body
+
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider so jsonify() and request.get_json() use orjson too."""
+    
+    def dumps(self, obj, **kwargs):
+        return _dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(_dumps(obj), mimetype=JSON_MIMETYPE)
+
+
+app.json = ORJSONProvider(app)
+
+
+def _transcode(doc):
+    """Transcode a raw BSON document straight to relaxed extended JSON bytes."""
+    return bsonjs.dumps(doc.raw, mode=bsonjs.RELAXED).encode()
+
+
+def response_mimetype():
+    """Pick the response format the client asked for in its Accept header."""
+    return request.accept_mimetypes.best_match(RESPONSE_MIMETYPES, default=JSON_MIMETYPE)
+
+
+def _encode(data, mimetype):
+    """Encode a response payload in the given format."""
+    if mimetype == BSON_MIMETYPE:
+        return bson_encode(data)
+    if mimetype == MSGPACK_MIMETYPE:
+        return ormsgpack.packb(
+            data,
+            default=_bson_default,
+            option=ormsgpack.OPT_PASSTHROUGH_DATETIME | ormsgpack.OPT_PASSTHROUGH_SUBCLASS
+        )
+    return _dumps(data)
 
 
 def serialize_response(data):
-    """Serialize MongoDB response to JSON-safe format."""
-    return json.loads(json_util.dumps(data))
+    """Serialize a MongoDB response in the format the client accepts."""
+    mimetype = response_mimetype()
+    return Response(_encode(data, mimetype), mimetype=mimetype)
+
+
+@app.after_request
+def vary_on_accept(response):
+    """Tell caches that the body depends on the Accept header."""
+    response.vary.add("Accept")
+    return response
+
+
+# Flush streamed responses in chunks of roughly this many bytes
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_cursor(cursor, meta, key="documents"):
+    """
+    Stream cursor results as a JSON object without materializing them.
+    
+    The response is meta with the documents under key and a trailing "count".
+    The first document is fetched up front so that query errors still turn
+    into a regular error response instead of a truncated 200.
+    
+    BSON and MessagePack need the document count or total size before the
+    first byte, so those responses are built in full instead.
+    """
+    if response_mimetype() != JSON_MIMETYPE:
+        documents = list(cursor)
+        return serialize_response(dict(meta, **{key: documents, "count": len(documents)}))
+    
+    first = next(cursor, None)
+    encode = _transcode if isinstance(first, RawBSONDocument) else _dumps
+    
+    def generate():
+        try:
+            buf = bytearray(_dumps(meta)[:-1])
+            buf += b',"%s":[' % key.encode()
+            count = 0
+            if first is not None:
+                for doc in itertools.chain((first,), cursor):
+                    if count:
+                        buf += b","
+                    buf += encode(doc)
+                    count += 1
+                    if len(buf) >= _STREAM_CHUNK_SIZE:
+                        yield bytes(buf)
+                        buf.clear()
+            buf += b'],"count":%d}' % count
+            yield bytes(buf)
+        finally:
+            cursor.close()
+    
+    return Response(generate(), mimetype=JSON_MIMETYPE)
+
+
+# Serialized metadata responses (database, collection and index listings, counts),
+# keyed by (endpoint, db, ...) and kept for a few seconds between polls. The cache
+# is per process, so other gunicorn workers may serve entries up to ttl old.
+# Each entry maps response mimetype -> body bytes.
+_metadata_cache = TTLCache(maxsize=256, ttl=5)
+_metadata_lock = threading.Lock()
+
+
+def cached_response(key):
+    """Return the cached response for key, or None on a miss."""
+    mimetype = response_mimetype()
+    with _metadata_lock:
+        body = _metadata_cache.get(key, {}).get(mimetype)
+    if body is None:
+        return None
+    return Response(body, mimetype=mimetype)
+
+
+def cache_response(key, data):
+    """Serialize data, cache the bytes under key and return the response."""
+    mimetype = response_mimetype()
+    body = _encode(data, mimetype)
+    with _metadata_lock:
+        _metadata_cache.setdefault(key, {})[mimetype] = body
+    return Response(body, mimetype=mimetype)
+
+
+def invalidate_metadata(db_name=None):
+    """Drop cached metadata for one database (plus the database list), or all of it."""
+    with _metadata_lock:
+        if db_name is None:
+            _metadata_cache.clear()
+            return
+        for key in list(_metadata_cache):
+            if len(key) == 1 or key[1] == db_name:
+                _metadata_cache.pop(key, None)
 
 
 def require_api_key(f):
     """Decorator to require API key authentication."""
     @wraps(f)
     def decorated(*args, **kwargs):
-        provided_key = request.headers.get("X-API-Key")
-        if not provided_key or provided_key != API_KEY:
-            return jsonify({"error": "Unauthorized - Invalid or missing API key"}), 401
+        # Read the WSGI environ directly rather than through request.headers
+        provided_key = request.environ.get("HTTP_X_API_KEY")
+        # WSGI header values are latin-1 decoded, so this recovers the raw bytes
+        if not provided_key or not secrets.compare_digest(provided_key.encode("latin-1"), _API_KEY_BYTES):
+            return serialize_response({"error": "Unauthorized - Invalid or missing API key"}), 401
         return f(*args, **kwargs)
     return decorated
 
 
+# The health check never changes, so every format is encoded once up front
+_INDEX_INFO = {
+    "service": "MongoDB HTTP Bridge",
+    "status": "running",
+    "auth_required": True,
+    "endpoints": [
+        "GET  /databases",
+        "GET  /databases/<db>/collections",
+        "POST /query",
+        "POST /aggregate",
+        "POST /insert",
+        "POST /update",
+        "POST /delete",
+        "POST /command",
+        "GET  /collection/<db>/<collection>/count",
+        "GET  /collection/<db>/<collection>/indexes"
+    ]
+}
+_INDEX_BODIES = {mimetype: _encode(_INDEX_INFO, mimetype) for mimetype in RESPONSE_MIMETYPES}
+
+
 @app.route("/", methods=["GET"])
 def index():
     """Health check endpoint."""
-    return jsonify({
-        "service": "MongoDB HTTP Bridge",
-        "status": "running",
-        "auth_required": True,
-        "endpoints": [
-            "GET  /databases",
-            "GET  /databases/<db>/collections",
-            "POST /query",
-            "POST /aggregate",
-            "POST /insert",
-            "POST /update",
-            "POST /delete",
-            "POST /command",
-            "GET  /collection/<db>/<collection>/count",
-            "GET  /collection/<db>/<collection>/indexes"
-        ]
-    })
+    mimetype = response_mimetype()
+    return Response(_INDEX_BODIES[mimetype], mimetype=mimetype)
 
 
 @app.route("/databases", methods=["GET"])
@@ -116,6 +426,10 @@ def index():
 def list_databases():
     """List all databases."""
     try:
+        cached = cached_response(("databases",))
+        if cached is not None:
+            return cached
+        
         client = get_client()
         databases = []
         for db_info in client.list_databases():
@@ -124,9 +438,27 @@ def list_databases():
                 "sizeOnDisk": db_info.get("sizeOnDisk"),
                 "empty": db_info.get("empty", False)
             })
-        return jsonify({"databases": databases})
+        return cache_response(("databases",), {"databases": databases})
+    except PyMongoError as e:
+        return serialize_response({"error": str(e)}), 500
+
+
+# Shared by list_collections to fan out collStats commands
+_stats_pool = ThreadPoolExecutor(max_workers=16)
+
+
+def _collection_stats(database, coll_name):
+    """Summarize collStats for one collection."""
+    try:
+        stats = database.command("collStats", coll_name)
+        return {
+            "name": coll_name,
+            "count": stats.get("count", 0),
+            "size": stats.get("size", 0),
+            "avgObjSize": stats.get("avgObjSize", 0)
+        }
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return {"name": coll_name, "error": str(e)}
 
 
 @app.route("/databases/<db>/collections", methods=["GET"])
@@ -134,27 +466,20 @@ def list_databases():
 def list_collections(db):
     """List all collections in a database."""
     try:
-        client = get_client()
-        database = client[db]
+        cached = cached_response(("collections", db))
+        if cached is not None:
+            return cached
+        
+        database = get_database(db)
         collections = database.list_collection_names()
         
-        # Get collection stats
-        collection_info = []
-        for coll_name in collections:
-            try:
-                stats = database.command("collStats", coll_name)
-                collection_info.append({
-                    "name": coll_name,
-                    "count": stats.get("count", 0),
-                    "size": stats.get("size", 0),
-                    "avgObjSize": stats.get("avgObjSize", 0)
-                })
-            except:
-                collection_info.append({"name": coll_name})
-        
-        return jsonify({"database": db, "collections": collection_info})
+        # Get collection stats, one collStats round-trip per collection in parallel
+        collection_info = list(_stats_pool.map(
+            lambda coll_name: _collection_stats(database, coll_name), collections))
+        
+        return cache_response(("collections", db), {"database": db, "collections": collection_info})
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
 
 
 @app.route("/query", methods=["POST"])
@@ -175,28 +500,27 @@ def query():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
         
         if not db_name or not coll_name:
-            return jsonify({"error": "database and collection are required"}), 400
+            return serialize_response({"error": "database and collection are required"}), 400
         
-        client = get_client()
-        collection = client[db_name][coll_name]
+        collection = get_result_collection(db_name, coll_name)
         
         # Parse query parameters
-        filter_query = parse_json_extended(data.get("filter", {}))
+        filter_query = data.get("filter", {})
         projection = data.get("projection")
         sort = data.get("sort")
         limit = data.get("limit", 100)
         skip = data.get("skip", 0)
         
         # Build cursor
-        cursor = collection.find(filter_query, projection)
+        cursor = collection.find(filter_query, projection).batch_size(1000)
         
         if sort:
             cursor = cursor.sort(sort)
@@ -205,19 +529,15 @@ def query():
         if limit:
             cursor = cursor.limit(limit)
         
-        # Execute and serialize
-        documents = list(cursor)
-        
-        return jsonify({
+        # Execute and stream
+        return stream_cursor(cursor, {
             "database": db_name,
-            "collection": coll_name,
-            "count": len(documents),
-            "documents": serialize_response(documents)
+            "collection": coll_name
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Query error: {str(e)}"}), 400
+        return serialize_response({"error": f"Query error: {str(e)}"}), 400
 
 
 @app.route("/aggregate", methods=["POST"])
@@ -233,40 +553,36 @@ def aggregate():
         "pipeline": [
             {"$match": {"status": "active"}},
             {"$group": {"_id": "$category", "count": {"$sum": 1}}}
-        ]
+        ],
+        "allowDiskUse": true  // optional, default true
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
         pipeline = data.get("pipeline", [])
+        allow_disk_use = data.get("allowDiskUse", True)
         
         if not db_name or not coll_name:
-            return jsonify({"error": "database and collection are required"}), 400
-        
-        client = get_client()
-        collection = client[db_name][coll_name]
+            return serialize_response({"error": "database and collection are required"}), 400
         
-        # Parse pipeline with extended JSON
-        pipeline = parse_json_extended(pipeline)
+        collection = get_result_collection(db_name, coll_name)
         
-        # Execute aggregation
-        results = list(collection.aggregate(pipeline))
+        # Execute aggregation, letting large $sort/$group stages spill to disk
+        cursor = collection.aggregate(pipeline, allowDiskUse=allow_disk_use, batchSize=1000)
         
-        return jsonify({
+        return stream_cursor(cursor, {
             "database": db_name,
-            "collection": coll_name,
-            "count": len(results),
-            "results": serialize_response(results)
-        })
+            "collection": coll_name
+        }, key="results")
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Aggregation error: {str(e)}"}), 400
+        return serialize_response({"error": f"Aggregation error: {str(e)}"}), 400
 
 
 @app.route("/insert", methods=["POST"])
@@ -284,9 +600,9 @@ def insert():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
@@ -294,29 +610,27 @@ def insert():
         ordered = data.get("ordered", True)
         
         if not db_name or not coll_name or not documents:
-            return jsonify({"error": "database, collection, and documents are required"}), 400
+            return serialize_response({"error": "database, collection, and documents are required"}), 400
         
-        client = get_client()
-        collection = client[db_name][coll_name]
+        collection = get_collection(db_name, coll_name)
         
         # Handle single document or list
         if isinstance(documents, dict):
             documents = [documents]
         
-        documents = parse_json_extended(documents)
-        
         result = collection.insert_many(documents, ordered=ordered)
+        invalidate_metadata(db_name)
         
-        return jsonify({
+        return serialize_response({
             "database": db_name,
             "collection": coll_name,
             "inserted_count": len(result.inserted_ids),
-            "inserted_ids": serialize_response(result.inserted_ids)
+            "inserted_ids": result.inserted_ids
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Insert error: {str(e)}"}), 400
+        return serialize_response({"error": f"Insert error: {str(e)}"}), 400
 
 
 @app.route("/update", methods=["POST"])
@@ -336,9 +650,9 @@ def update():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
@@ -348,30 +662,27 @@ def update():
         upsert = data.get("upsert", False)
         
         if not db_name or not coll_name or not update_doc:
-            return jsonify({"error": "database, collection, and update are required"}), 400
-        
-        client = get_client()
-        collection = client[db_name][coll_name]
+            return serialize_response({"error": "database, collection, and update are required"}), 400
         
-        filter_query = parse_json_extended(filter_query)
-        update_doc = parse_json_extended(update_doc)
+        collection = get_collection(db_name, coll_name)
         
         if many:
             result = collection.update_many(filter_query, update_doc, upsert=upsert)
         else:
             result = collection.update_one(filter_query, update_doc, upsert=upsert)
+        invalidate_metadata(db_name)
         
-        return jsonify({
+        return serialize_response({
             "database": db_name,
             "collection": coll_name,
             "matched_count": result.matched_count,
             "modified_count": result.modified_count,
-            "upserted_id": serialize_response(result.upserted_id) if result.upserted_id else None
+            "upserted_id": result.upserted_id
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Update error: {str(e)}"}), 400
+        return serialize_response({"error": f"Update error: {str(e)}"}), 400
 
 
 @app.route("/delete", methods=["POST"])
@@ -389,9 +700,9 @@ def delete():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
@@ -399,27 +710,25 @@ def delete():
         many = data.get("many", False)
         
         if not db_name or not coll_name:
-            return jsonify({"error": "database and collection are required"}), 400
+            return serialize_response({"error": "database and collection are required"}), 400
         
-        client = get_client()
-        collection = client[db_name][coll_name]
-        
-        filter_query = parse_json_extended(filter_query)
+        collection = get_collection(db_name, coll_name)
         
         if many:
             result = collection.delete_many(filter_query)
         else:
             result = collection.delete_one(filter_query)
+        invalidate_metadata(db_name)
         
-        return jsonify({
+        return serialize_response({
             "database": db_name,
             "collection": coll_name,
             "deleted_count": result.deleted_count
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Delete error: {str(e)}"}), 400
+        return serialize_response({"error": f"Delete error: {str(e)}"}), 400
 
 
 @app.route("/command", methods=["POST"])
@@ -435,30 +744,30 @@ def run_command():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database", "admin")
         command = data.get("command")
         
         if not command:
-            return jsonify({"error": "command is required"}), 400
+            return serialize_response({"error": "command is required"}), 400
         
-        client = get_client()
-        database = client[db_name]
+        database = get_database(db_name)
         
-        command = parse_json_extended(command)
         result = database.command(command)
+        # Commands can create, drop or rename anything, in any database
+        invalidate_metadata()
         
-        return jsonify({
+        return serialize_response({
             "database": db_name,
-            "result": serialize_response(result)
+            "result": result
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Command error: {str(e)}"}), 400
+        return serialize_response({"error": f"Command error: {str(e)}"}), 400
 
 
 @app.route("/collection/<db>/<collection>/count", methods=["GET"])
@@ -466,16 +775,19 @@ def run_command():
 def count_documents(db, collection):
     """Get document count for a collection."""
     try:
-        client = get_client()
-        coll = client[db][collection]
+        cached = cached_response(("count", db, collection))
+        if cached is not None:
+            return cached
+        
+        coll = get_collection(db, collection)
         count = coll.estimated_document_count()
-        return jsonify({
+        return cache_response(("count", db, collection), {
             "database": db,
             "collection": collection,
             "count": count
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
 
 
 @app.route("/collection/<db>/<collection>/indexes", methods=["GET"])
@@ -483,16 +795,19 @@ def count_documents(db, collection):
 def list_indexes(db, collection):
     """List indexes for a collection."""
     try:
-        client = get_client()
-        coll = client[db][collection]
+        cached = cached_response(("indexes", db, collection))
+        if cached is not None:
+            return cached
+        
+        coll = get_collection(db, collection)
         indexes = list(coll.list_indexes())
-        return jsonify({
+        return cache_response(("indexes", db, collection), {
             "database": db,
             "collection": collection,
-            "indexes": serialize_response(indexes)
+            "indexes": indexes
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
 
 
 @app.route("/sample", methods=["POST"])
@@ -509,34 +824,31 @@ def sample():
     }
     """
     try:
-        data = request.get_json()
+        data = parse_request_json()
         if not data:
-            return jsonify({"error": "Request body required"}), 400
+            return serialize_response({"error": "Request body required"}), 400
         
         db_name = data.get("database")
         coll_name = data.get("collection")
         size = data.get("size", 5)
         
         if not db_name or not coll_name:
-            return jsonify({"error": "database and collection are required"}), 400
+            return serialize_response({"error": "database and collection are required"}), 400
         
-        client = get_client()
-        collection = client[db_name][coll_name]
+        collection = get_result_collection(db_name, coll_name)
         
         # Use $sample aggregation
         pipeline = [{"$sample": {"size": size}}]
-        results = list(collection.aggregate(pipeline))
+        cursor = collection.aggregate(pipeline)
         
-        return jsonify({
+        return stream_cursor(cursor, {
             "database": db_name,
-            "collection": coll_name,
-            "count": len(results),
-            "documents": serialize_response(results)
+            "collection": coll_name
         })
     except PyMongoError as e:
-        return jsonify({"error": str(e)}), 500
+        return serialize_response({"error": str(e)}), 500
     except Exception as e:
-        return jsonify({"error": f"Sample error: {str(e)}"}), 400
+        return serialize_response({"error": f"Sample error: {str(e)}"}), 400
 
 
 if __name__ == "__main__":
@@ -564,4 +876,6 @@ if __name__ == "__main__":
             print("   Generate self-signed cert: openssl req -x509 -newkey rsa:4096 -keyout key.pem -out cert.pem -days 365 -nodes")
             sys.exit(1)
     
+    # HTTP/1.1 keeps client connections alive between requests
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
     app.run(host=args.host, port=args.port, ssl_context=ssl_context, threaded=True)